@@ -1,9 +1,13 @@
 import re
 import sys
-import requests
+import argparse
+import urllib3
 import os
-from typing import List, Set, Tuple, Optional
+import mmap
+from typing import Dict, Iterable, Iterator, List, Set, Tuple, Optional
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import chain, islice
 
 # 配置常量
 DEFAULT_URL = "https://raw.githubusercontent.com/felixonmars/dnsmasq-china-list/master/accelerated-domains.china.conf"
@@ -11,53 +15,97 @@ OUTPUT_DIR = "dist"
 DEFAULT_OUTPUT = os.path.join(OUTPUT_DIR, "whitelist.hostrules")
 PREWHITE_FILE = "prewhite.hostrules"
 PREBLACK_FILE = "preblack.hostrules"
-SEPARATOR_COMMENT = "# -------autogen------"
-BLACKLIST_COMMENT_PREFIX = "# blocked "
+SEPARATOR_COMMENT = b"# -------autogen------"
+BLACKLIST_COMMENT_PREFIX = b"# blocked "
+PARALLEL_THRESHOLD = 1_000_000  # 输入文件超过该字节数时使用多进程并行处理
 
+# dnsmasq 配置中的域名规则，形如 server=/example.com/114.114.114.114
+_SERVER_PREFIX = b'server=/'
+_DOMAIN_RE = re.compile(rb'server=/([^/]+)/')
 
-def is_blacklisted(domain: str, blacklist: List[str]) -> Optional[str]:
+# 复用连接的HTTP连接池，多个URL来自同一主机时可省去重复的TLS握手
+_HTTP = urllib3.PoolManager(maxsize=2)
+
+# 并行处理时每个工作进程持有的黑名单，由 _init_worker 设置
+_worker_blacklist: Optional['LabelTrie'] = None
+
+
+def _suffixes(host: bytes) -> Iterator[bytes]:
+    """依次生成域名本身及其各级父域名，如 a.b.c -> a.b.c, b.c, c"""
+    while host:
+        yield host
+        host = host.partition(b'.')[2]
+
+class LabelTrie:
     """
-    检查一个域名是否在黑名单中，或是黑名单中某个域名的子域名
+    按域名标签从右到左组织的前缀树，用于检查一个域名是否为黑名单中的域名或其子域名
     
-    Args:
-        domain: 要检查的域名
-        blacklist: 黑名单域名列表
-    
-    Returns:
-        匹配的黑名单域名，如果不匹配则返回None
+    每个节点对应一个标签，如 a.example.com 依次经过 com -> example -> a 三个节点，
+    查找时从顶级域名开始逐级下降，遇到标记为终点的节点即命中，无对应子节点则提前结束
     """
-    if not domain.startswith('.'):
-        domain = '.' + domain
-    
-    for black_domain in blacklist:
-        black = black_domain.strip()
-        if not black or black.startswith('#'):  # 跳过空行和注释
-            continue
-            
-        if not black.startswith('.'):
-            black = '.' + black
-            
-        # 检查domain是否是black或其子域名
-        if domain == black or domain.endswith(black):
-            return black
-    
-    return None
+    __slots__ = ('kids', 'terminal')
+    
+    def __init__(self) -> None:
+        self.kids: Dict[bytes, 'LabelTrie'] = {}
+        self.terminal = False
+    
+    def __bool__(self) -> bool:
+        return self.terminal or bool(self.kids)
+    
+    def insert(self, domain: bytes) -> None:
+        """插入一个域名（已去除前导点并转为小写）"""
+        node = self
+        for label in reversed(domain.split(b'.')):
+            child = node.kids.get(label)
+            if child is None:
+                child = node.kids[label] = LabelTrie()
+            node = child
+        node.terminal = True
+    
+    def match(self, domain: bytes) -> Optional[bytes]:
+        """
+        检查一个域名是否在黑名单中，或是黑名单中某个域名的子域名
+        
+        Args:
+            domain: 要检查的域名
+        
+        Returns:
+            匹配的黑名单域名，如果不匹配则返回None
+        """
+        labels = domain.lstrip(b'.').lower().split(b'.')
+        node = self
+        for i in range(len(labels) - 1, -1, -1):
+            child = node.kids.get(labels[i])
+            if child is None:
+                return None
+            node = child
+            if node.terminal:
+                return b'.' + b'.'.join(labels[i:])
+        
+        return None
 
-def load_blacklist() -> List[str]:
+def load_blacklist() -> LabelTrie:
     """
     加载黑名单文件内容
     
     Returns:
-        黑名单域名列表
+        由黑名单域名构建的前缀树
     """
-    blacklist = []
+    blacklist = LabelTrie()
     
     if os.path.isfile(PREBLACK_FILE):
         try:
-            with open(PREBLACK_FILE, 'r', encoding='utf-8') as f:
-                blacklist = [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
-                if blacklist:
-                    print(f"找到预定义黑名单文件 '{PREBLACK_FILE}'，包含 {len(blacklist)} 个需要排除的域名")
+            with open(PREBLACK_FILE, 'rb') as f:
+                entries = {
+                    line.strip().lstrip(b'.').lower()
+                    for line in f
+                    if line.strip() and not line.strip().startswith(b'#')
+                }
+                entries.discard(b'')
+                for entry in entries:
+                    blacklist.insert(entry)
+                if entries:
+                    print(f"找到预定义黑名单文件 '{PREBLACK_FILE}'，包含 {len(entries)} 个需要排除的域名")
         except Exception as e:
             print(f"读取预定义黑名单文件时出错：{e}")
     else:
@@ -65,190 +113,345 @@ def load_blacklist() -> List[str]:
     
     return blacklist
 
-def process_domain(domain: str, blacklist: List[str]) -> Tuple[str, bool]:
+def _read_prewhite_raw() -> Optional[Tuple[bytes, ...]]:
+    """
+    读取预定义白名单文件的原始内容，不输出任何信息，可在后台线程中调用
+    
+    Returns:
+        去除首尾空白后的各行内容，如果文件不存在则返回None
+    """
+    if not os.path.isfile(PREWHITE_FILE):
+        return None
+    
+    with open(PREWHITE_FILE, 'rb') as f:
+        return tuple(line.strip() for line in f)
+
+def load_rule_files() -> Tuple[LabelTrie, Optional[Tuple[bytes, ...]]]:
+    """
+    读取预定义黑名单和白名单文件，白名单在后台线程中读取，与黑名单的读取和解析同时进行，
+    提示信息统一在当前线程中按固定顺序输出
+    
+    Returns:
+        (黑名单前缀树, 预定义白名单文件的各行内容，文件不存在或读取失败时为None)
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        prewhite_future = executor.submit(_read_prewhite_raw)
+        blacklist = load_blacklist()
+        
+        try:
+            prewhite_raw = prewhite_future.result()
+        except Exception as e:
+            print(f"读取预定义白名单文件时出错：{e}")
+            return blacklist, None
+    
+    if prewhite_raw is None:
+        print(f"未找到预定义白名单文件 '{PREWHITE_FILE}'")
+    return blacklist, prewhite_raw
+
+def parse_server_line(line: bytes) -> Optional[bytes]:
+    """
+    从一行 dnsmasq 配置中提取域名
+    
+    Args:
+        line: 一行原始配置内容
+    
+    Returns:
+        提取到的域名，如果该行不是域名规则则返回None
+    """
+    # 绝大多数行以 server=/ 开头，直接切片查找，避免正则匹配的开销
+    if line.startswith(_SERVER_PREFIX):
+        domain, sep, _ = line[len(_SERVER_PREFIX):].partition(b'/')
+        return domain if sep and domain else None
+    
+    # 格式不规整的行（如带有前导空白）退回到正则匹配
+    match = _DOMAIN_RE.search(line)
+    return match.group(1) if match else None
+
+def process_domain(domain: bytes, blacklist: LabelTrie) -> Tuple[bytes, bool]:
     """
     处理单个域名，检查是否在黑名单中并格式化
     
     Args:
         domain: 原始域名
-        blacklist: 黑名单域名列表
+        blacklist: 黑名单前缀树
     
     Returns:
         (格式化后的域名, 是否被加入黑名单)
     """
-    domain_with_dot = f".{domain}"
+    domain_with_dot = b'.' + domain
     
     # 检查是否在黑名单中
     if blacklist:
-        matched_blacklist = is_blacklisted(domain, blacklist)
+        matched_blacklist = blacklist.match(domain)
         if matched_blacklist:
             # 将域名添加为注释
-            return f"{BLACKLIST_COMMENT_PREFIX}{domain_with_dot}", True
+            return BLACKLIST_COMMENT_PREFIX + domain_with_dot, True
     
     # 不在黑名单中，正常添加
     return domain_with_dot, False
 
-def extract_domains_from_url(url: str, output_file: str) -> bool:
+def _iter_lines(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """将按块读取的数据流切分为行"""
+    pending = b''
+    for chunk in chunks:
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+def process_lines(lines: Iterable[bytes], blacklist: LabelTrie) -> Tuple[List[bytes], int]:
     """
-    从URL下载内容，提取域名并以特定格式保存到输出文件
+    从 dnsmasq 配置的各行中提取域名，检查黑名单并格式化
     
     Args:
-        url: 源URL
-        output_file: 输出文件路径
+        lines: 原始配置内容的各行
+        blacklist: 黑名单前缀树
     
     Returns:
-        是否成功
+        (处理后的域名列表, 被标记为注释的黑名单域名数量)
     """
     processed_domains = []
     blacklisted_count = 0
-    blacklist = load_blacklist()
     
-    # 从URL获取内容
+    for line in lines:
+        domain = parse_server_line(line)
+        if not domain:
+            continue
+        processed_domain, is_blacklisted = process_domain(domain, blacklist)
+        processed_domains.append(processed_domain)
+        if is_blacklisted:
+            blacklisted_count += 1
+    
+    return processed_domains, blacklisted_count
+
+def _init_worker(blacklist: LabelTrie) -> None:
+    """工作进程初始化函数，保存一份黑名单供后续各分块使用"""
+    global _worker_blacklist
+    _worker_blacklist = blacklist
+
+def _process_chunk(input_file: str, start: int, end: int) -> Tuple[List[bytes], int]:
+    """在工作进程中处理输入文件 [start, end) 范围内的内容，返回值同 process_lines"""
+    with open(input_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        assert _worker_blacklist is not None  # 由 _init_worker 在进程启动时设置
+        return process_lines(mm[start:end].splitlines(), _worker_blacklist)
+
+def process_file_parallel(input_file: str, blacklist: LabelTrie) -> Tuple[List[bytes], int]:
+    """
+    将输入文件按行边界切分为若干块，使用多个进程并行提取域名并检查黑名单
+    
+    Args:
+        input_file: 输入文件路径
+        blacklist: 黑名单前缀树
+    
+    Returns:
+        (处理后的域名列表, 被标记为注释的黑名单域名数量)
+    """
+    workers = os.cpu_count() or 1
+    
+    # 在每个分块的目标位置之后寻找换行符作为边界，避免把一行拆到两个分块中
+    with open(input_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        bounds = [0]
+        for i in range(1, workers):
+            pos = mm.find(b'\n', max(size * i // workers, bounds[-1]))
+            if pos < 0:
+                break
+            bounds.append(pos + 1)
+        bounds.append(size)
+    
+    # 工作进程只接收文件路径和偏移量，各自映射文件，无需在进程间传输文件内容
+    ranges = [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+    starts, ends = zip(*ranges)
+    with ProcessPoolExecutor(max_workers=len(ranges), initializer=_init_worker, initargs=(blacklist,)) as pool:
+        results = list(pool.map(_process_chunk, [input_file] * len(ranges), starts, ends))
+    
+    processed_domains = list(chain.from_iterable(domains for domains, _ in results))
+    blacklisted_count = sum(count for _, count in results)
+    return processed_domains, blacklisted_count
+
+def remove_redundant_subdomains(domains: List[bytes]) -> List[bytes]:
+    """
+    去除重复的域名，以及父域名已在列表中的子域名（如已有 .example.com 时的 .a.example.com）
+    
+    Args:
+        domains: 处理后的域名列表，被标记为注释的黑名单域名只去除完全重复的条目
+    
+    Returns:
+        去重后的域名列表，保持原有顺序
+    """
+    domain_set = {d.lstrip(b'.') for d in domains if not d.startswith(BLACKLIST_COMMENT_PREFIX)}
+    emitted: Set[bytes] = set()
+    result = []
+    
+    for domain in domains:
+        if domain.startswith(BLACKLIST_COMMENT_PREFIX):
+            # 注释以 # 开头，不会与域名冲突，可共用同一个集合
+            if domain not in emitted:
+                emitted.add(domain)
+                result.append(domain)
+            continue
+        
+        host = domain.lstrip(b'.')
+        if host in emitted:
+            continue  # 重复的域名
+        if any(suffix in domain_set for suffix in islice(_suffixes(host), 1, None)):
+            continue  # 父域名已在列表中
+        
+        emitted.add(host)
+        result.append(domain)
+    
+    removed_count = len(domains) - len(result)
+    if removed_count > 0:
+        print(f"已去除 {removed_count} 个重复或已被父域名覆盖的域名")
+    
+    return result
+
+def extract_domains_from_url(url: str, blacklist: LabelTrie) -> Optional[List[bytes]]:
+    """
+    从URL下载内容，提取域名并检查黑名单
+    
+    Args:
+        url: 源URL
+        blacklist: 黑名单前缀树
+    
+    Returns:
+        处理后的域名列表，如果失败则返回None
+    """
+    # 从URL流式获取内容（请求gzip压缩传输），边下载边提取域名，无需在内存中保留完整响应
     try:
         print(f"正在从 {url} 获取域名列表...")
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()  # 如果请求失败则抛出异常
-        content = response.text
-    except requests.exceptions.RequestException as e:
+        response = _HTTP.request('GET', url, headers={'Accept-Encoding': 'gzip'},
+                                 preload_content=False, timeout=30)
+        try:
+            if response.status >= 400:
+                print(f"获取URL内容时出错：HTTP {response.status} {response.reason}")
+                return None
+            chunks = response.stream(65536, decode_content=True)
+            processed_domains, blacklisted_count = process_lines(_iter_lines(chunks), blacklist)
+        finally:
+            response.release_conn()
+    except urllib3.exceptions.HTTPError as e:
         print(f"获取URL内容时出错：{e}")
-        return False
+        return None
     
-    # 使用正则表达式提取所有域名
-    domain_pattern = re.compile(r'server=/([^/]+)/')
-    matches = domain_pattern.findall(content)
-    
-    if not matches:
+    if not processed_domains:
         print("警告：未找到任何域名")
-        return False
-    
-    # 处理所有匹配的域名
-    for domain in matches:
-        processed_domain, is_blacklisted = process_domain(domain, blacklist)
-        processed_domains.append(processed_domain)
-        if is_blacklisted:
-            blacklisted_count += 1
+        return None
     
     if blacklisted_count > 0:
         print(f"已将 {blacklisted_count} 个在黑名单中的域名或其子域名标记为注释")
     
-    # 添加预定义白名单域名并保存
-    return save_domains_with_prewhite(processed_domains, output_file)
+    return processed_domains
 
-def extract_domains_from_file(input_file: str, output_file: str) -> bool:
+def extract_domains_from_file(input_file: str, blacklist: LabelTrie) -> Optional[List[bytes]]:
     """
-    从本地文件中提取域名并以特定格式保存到输出文件
+    从本地文件中提取域名并检查黑名单
     
     Args:
         input_file: 输入文件路径
-        output_file: 输出文件路径
+        blacklist: 黑名单前缀树
     
     Returns:
-        是否成功
+        处理后的域名列表，如果失败则返回None
     """
-    processed_domains = []
-    blacklisted_count = 0
-    blacklist = load_blacklist()
-    
-    # 读取输入文件
+    # 读取输入文件并逐行提取所有域名，文件较大时使用多进程并行处理
     try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # 使用正则表达式提取所有域名
-        domain_pattern = re.compile(r'server=/([^/]+)/')
-        matches = domain_pattern.findall(content)
-        
-        if not matches:
-            print("警告：未在输入文件中找到任何域名")
-            return False
-            
-        # 处理所有匹配的域名
-        for domain in matches:
-            processed_domain, is_blacklisted = process_domain(domain, blacklist)
-            processed_domains.append(processed_domain)
-            if is_blacklisted:
-                blacklisted_count += 1
-                
+        if os.path.getsize(input_file) > PARALLEL_THRESHOLD and (os.cpu_count() or 1) > 1:
+            processed_domains, blacklisted_count = process_file_parallel(input_file, blacklist)
+        else:
+            with open(input_file, 'rb') as f:
+                content = f.read()
+            processed_domains, blacklisted_count = process_lines(content.splitlines(), blacklist)
     except FileNotFoundError:
         print(f"错误：找不到输入文件 '{input_file}'")
-        return False
+        return None
     except Exception as e:
         print(f"读取文件时出错：{e}")
-        return False
+        return None
+    
+    if not processed_domains:
+        print("警告：未在输入文件中找到任何域名")
+        return None
     
     if blacklisted_count > 0:
         print(f"已将 {blacklisted_count} 个在黑名单中的域名或其子域名标记为注释")
     
-    # 添加预定义白名单域名并保存
-    return save_domains_with_prewhite(processed_domains, output_file)
+    return processed_domains
 
-def save_domains_with_prewhite(domains: List[str], output_file: str) -> bool:
+def _output_unchanged(output_file: str, body: bytes) -> bool:
+    """
+    检查输出文件的现有内容是否与即将写入的内容相同
+    
+    Args:
+        output_file: 输出文件路径
+        body: 即将写入的内容（不含末尾换行）
+    
+    Returns:
+        内容是否相同，文件不存在或无法读取时返回False
+    """
+    try:
+        # 大小不同时无需读取文件
+        if os.path.getsize(output_file) != len(body) + 1:
+            return False
+        with open(output_file, 'rb') as f:
+            existing = f.read()
+    except OSError:
+        return False
+    
+    return existing.endswith(b'\n') and memoryview(existing)[:-1] == body
+
+def save_domains_with_prewhite(domains: List[bytes], output_file: str, blacklist: LabelTrie,
+                               prewhite_raw: Optional[Tuple[bytes, ...]]) -> bool:
     """
     将域名列表保存到输出文件，并在开头添加预定义白名单的内容
     
     Args:
         domains: 处理后的域名列表
         output_file: 输出文件路径
+        blacklist: 黑名单前缀树
+        prewhite_raw: 预定义白名单文件的各行内容，文件不存在时为None
     
     Returns:
         是否成功
     """
     all_domains = []
-    prewhite_domains_set: Set[str] = set()
-    blacklist = load_blacklist()
-    
-    # 检查是否存在预定义白名单文件
-    if os.path.isfile(PREWHITE_FILE):
-        try:
-            with open(PREWHITE_FILE, 'r', encoding='utf-8') as f:
-                prewhite_domains = []
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith('#'):  # 跳过空行和注释
-                        prewhite_domains.append(line)
-                        continue
-                    
-                    # 检查白名单域名是否在黑名单中
-                    if blacklist:
-                        matched_blacklist = is_blacklisted(line, blacklist)
-                        if matched_blacklist:
-                            # 将域名添加为注释
-                            prewhite_domains.append(f"{BLACKLIST_COMMENT_PREFIX}{line}")
-                            print(f"警告：白名单中的域名 '{line}' 在黑名单中或是黑名单中域名的子域名，已标记为注释")
-                            continue
-                    
-                    prewhite_domains.append(line)
-                    if line and not line.startswith('#'):
-                        prewhite_domains_set.add(line)
-                
-                if prewhite_domains:
-                    print(f"找到预定义白名单文件 '{PREWHITE_FILE}'，包含 {len(prewhite_domains)} 个域名")
-                    all_domains.extend(prewhite_domains)
-                else:
-                    print(f"预定义白名单文件 '{PREWHITE_FILE}' 存在但为空")
-        except Exception as e:
-            print(f"读取预定义白名单文件时出错：{e}")
-    else:
-        print(f"未找到预定义白名单文件 '{PREWHITE_FILE}'")
+    prewhite_domains_set: Set[bytes] = set()
+    domains = remove_redundant_subdomains(domains)
+    # 检查预定义白名单中的域名是否在黑名单中
+    if prewhite_raw is not None:
+        prewhite_domains = []
+        for line in prewhite_raw:
+            if not line or line.startswith(b'#'):  # 跳过空行和注释
+                prewhite_domains.append(line)
+                continue
+            
+            if blacklist:
+                matched_blacklist = blacklist.match(line)
+                if matched_blacklist:
+                    # 将域名添加为注释
+                    prewhite_domains.append(BLACKLIST_COMMENT_PREFIX + line)
+                    print(f"警告：白名单中的域名 '{line.decode(errors='replace')}' 在黑名单中或是黑名单中域名的子域名，已标记为注释")
+                    continue
+            
+            prewhite_domains.append(line)
+            prewhite_domains_set.add(line)
+        
+        if prewhite_domains:
+            print(f"找到预定义白名单文件 '{PREWHITE_FILE}'，包含 {len(prewhite_domains)} 个域名")
+            all_domains.extend(prewhite_domains)
+        else:
+            print(f"预定义白名单文件 '{PREWHITE_FILE}' 存在但为空")
     
     # 始终添加分隔注释，无论是否有预定义白名单
     all_domains.append(SEPARATOR_COMMENT)
     
-    # 过滤从源获取的域名（排除已在预定义白名单中的域名）
-    filtered_domains = []
-    for domain in domains:
-        # 如果是注释（已标记为黑名单的域名），直接添加
-        if domain.startswith(BLACKLIST_COMMENT_PREFIX):
-            filtered_domains.append(domain)
-            continue
-            
-        # 普通域名，检查是否在白名单中
-        if domain in prewhite_domains_set:
-            continue  # 跳过已在预定义白名单中的域名
-        
-        filtered_domains.append(domain)
-    
-    all_domains.extend(filtered_domains)
+    # 过滤从源获取的域名（排除已在预定义白名单中的域名），
+    # 已标记为黑名单注释的域名不可能出现在白名单集合中，会被原样保留
+    if prewhite_domains_set:
+        all_domains.extend([d for d in domains if d not in prewhite_domains_set])
+    else:
+        all_domains.extend(domains)
     
     # 计算统计信息
     stats = Counter()
@@ -257,7 +460,7 @@ def save_domains_with_prewhite(domains: List[str], output_file: str) -> bool:
             continue
         elif domain.startswith(BLACKLIST_COMMENT_PREFIX):
             stats['blacklisted'] += 1
-        elif domain.startswith('#'):
+        elif domain.startswith(b'#'):
             stats['comments'] += 1
         else:
             stats['effective'] += 1
@@ -265,19 +468,30 @@ def save_domains_with_prewhite(domains: List[str], output_file: str) -> bool:
     # 确保输出目录存在
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
     
-    # 保存到输出文件
+    # 保存到输出文件，内容没有变化时跳过写入，避免下游程序不必要地重新加载
+    body = b'\n'.join(all_domains)
+    tmp_file = output_file + '.tmp'
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(all_domains) + '\n')
+        if _output_unchanged(output_file, body):
+            print(f"'{output_file}' 的内容没有变化（共 {len(all_domains)} 个条目），跳过写入")
+        else:
+            # 先写入临时文件再替换，避免其他程序读到写了一半的文件
+            with open(tmp_file, 'wb') as f:
+                # 末尾换行单独写入以避免再复制整个内容
+                f.write(body)
+                f.write(b'\n')
+            os.replace(tmp_file, output_file)
+            print(f"成功将总共 {len(all_domains)} 个条目保存到 '{output_file}'")
         
-        print(f"成功将总共 {len(all_domains)} 个条目保存到 '{output_file}'")
         print(f"  其中包含 {stats['effective']} 个有效域名")
         print(f"  其中包含 {stats['blacklisted']} 个被标记为注释的黑名单域名")
         print(f"  其中包含 {stats['comments']} 个其他注释")
-        print(f"  已在自动生成的内容前面添加分隔注释：'{SEPARATOR_COMMENT}'")
+        print(f"  已在自动生成的内容前面添加分隔注释：'{SEPARATOR_COMMENT.decode()}'")
         return True
     except Exception as e:
         print(f"保存文件时出错：{e}")
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
         return False
 
 def resolve_output_path(filename: str) -> str:
@@ -294,56 +508,62 @@ def resolve_output_path(filename: str) -> str:
         return os.path.join(OUTPUT_DIR, filename)
     return filename
 
-def print_help() -> None:
-    """打印帮助信息"""
-    print("使用方法：")
-    print("1. 无参数: 使用默认URL和输出文件")
-    print("   示例: python main.py")
-    print("2. 指定输出文件: python main.py <输出文件>")
-    print("   示例: python main.py my_whitelist.hostrules")
-    print("3. 指定URL: python main.py --url <URL> [输出文件]")
-    print("   示例: python main.py --url https://example.com/domains.txt whitelist.hostrules")
-    print("4. 从本地文件: python main.py --file <输入文件> [输出文件]")
-    print("   示例: python main.py --file input.txt whitelist.hostrules")
-    print(f"默认URL: {DEFAULT_URL}")
-    print(f"默认输出目录: {OUTPUT_DIR}")
-    print(f"默认输出文件: {DEFAULT_OUTPUT}")
-    print(f"预定义白名单文件: {PREWHITE_FILE} (如果存在会自动合并且优先放在前面)")
-    print(f"预定义黑名单文件: {PREBLACK_FILE} (如果存在会自动排除这些域名及其子域名，但会保留为注释)")
+def build_arg_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(
+        description="从 dnsmasq 配置中提取域名，生成 hostrules 白名单文件",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=(
+            "示例:\n"
+            "  python main.py\n"
+            "  python main.py my_whitelist.hostrules\n"
+            "  python main.py --url https://example.com/domains.txt whitelist.hostrules\n"
+            "  python main.py --url <URL1> --url <URL2> whitelist.hostrules\n"
+            "  python main.py --file input.txt whitelist.hostrules\n"
+            "\n"
+            f"默认URL: {DEFAULT_URL}\n"
+            f"默认输出目录: {OUTPUT_DIR}\n"
+            f"预定义白名单文件: {PREWHITE_FILE} (如果存在会自动合并且优先放在前面)\n"
+            f"预定义黑名单文件: {PREBLACK_FILE} (如果存在会自动排除这些域名及其子域名，但会保留为注释)"
+        ),
+    )
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--url", action="append", metavar="URL",
+                        help="源URL，可多次指定以合并多个列表（默认使用默认URL）")
+    source.add_argument("--file", metavar="INPUT", help="从本地文件读取")
+    parser.add_argument("output", nargs="?", default=DEFAULT_OUTPUT,
+                        help=f"输出文件，只提供文件名时保存到默认输出目录（默认: {DEFAULT_OUTPUT}）")
+    return parser
 
 def main() -> int:
     """主函数，处理命令行参数并执行相应操作"""
-    # 处理命令行参数
-    if len(sys.argv) == 1:
-        # 没有参数时使用默认值
-        print(f"未提供参数，使用默认URL: {DEFAULT_URL}")
-        print(f"默认输出文件: {DEFAULT_OUTPUT}")
-        success = extract_domains_from_url(DEFAULT_URL, DEFAULT_OUTPUT)
-    elif len(sys.argv) == 2:
-        # 只有一个参数时，假定为输出文件，使用默认URL
-        output_file = resolve_output_path(sys.argv[1])
-        print(f"使用默认URL: {DEFAULT_URL}")
-        print(f"输出文件: {output_file}")
-        success = extract_domains_from_url(DEFAULT_URL, output_file)
-    elif sys.argv[1] == "--url" and len(sys.argv) >= 3:
-        # 使用--url参数
-        url = sys.argv[2]
-        output_file = DEFAULT_OUTPUT if len(sys.argv) <= 3 else resolve_output_path(sys.argv[3])
-        print(f"使用URL: {url}")
-        print(f"输出文件: {output_file}")
-        success = extract_domains_from_url(url, output_file)
-    elif sys.argv[1] == "--file" and len(sys.argv) >= 3:
-        # 使用--file参数从本地文件读取
-        input_file = sys.argv[2]
-        output_file = DEFAULT_OUTPUT if len(sys.argv) <= 3 else resolve_output_path(sys.argv[3])
-        print(f"从本地文件读取: {input_file}")
-        print(f"输出文件: {output_file}")
-        success = extract_domains_from_file(input_file, output_file)
+    args = build_arg_parser().parse_args()
+    output_file = resolve_output_path(args.output)
+    urls = args.url or [DEFAULT_URL]
+    
+    if args.file:
+        print(f"从本地文件读取: {args.file}")
     else:
-        # 其他情况显示帮助信息
-        print_help()
-        return 1
+        print(f"使用URL: {', '.join(urls)}")
+    print(f"输出文件: {output_file}")
     
+    # 黑名单和白名单只加载一次，供所有输入源及保存时共用
+    blacklist, prewhite_raw = load_rule_files()
+    
+    if args.file:
+        domains = extract_domains_from_file(args.file, blacklist)
+        if domains is None:
+            return 1
+    else:
+        domains = []
+        for url in urls:
+            url_domains = extract_domains_from_url(url, blacklist)
+            if url_domains is None:
+                return 1
+            domains.extend(url_domains)
+    
+    # 添加预定义白名单域名并保存
+    success = save_domains_with_prewhite(domains, output_file, blacklist, prewhite_raw)
     return 0 if success else 1
 
 if __name__ == "__main__":